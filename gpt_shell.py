@@ -8,10 +8,101 @@ import os
 import sys
 import subprocess
 import json
-import re
-from typing import Optional, Tuple
+import math
+import shlex
+import shutil
+import hashlib
+import operator
+import signal
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Optional, Tuple
 from openai import OpenAI
 
+try:
+    import ahocorasick
+except ImportError:  # Fall back to per-pattern substring checks
+    ahocorasick = None
+
+# Structured output schema; the API guarantees responses match it
+COMMAND_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "shell_command",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "command": {
+                    "type": "string",
+                    "description": "the actual shell command to execute"
+                },
+                "explanation": {
+                    "type": "string",
+                    "description": "human-friendly explanation of what this does"
+                },
+                "warning": {
+                    "type": ["string", "null"],
+                    "description": "warning message if dangerous, otherwise null"
+                },
+                "safe": {"type": "boolean"}
+            },
+            "required": ["command", "explanation", "warning", "safe"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Most recent output lines kept per stream when running a command
+MAX_OUTPUT_LINES = 1000
+
+# Seconds a command may run before it and all its descendants are killed
+COMMAND_TIMEOUT = 30
+
+# Characters that need /bin/sh to interpret; commands without them run directly
+SHELL_METACHARACTERS = frozenset('|&;<>()$`\\"\'*?[]{}~!#\n')
+
+
+def _descendant_pids(pid: int) -> list:
+    """Return the PIDs of every live descendant of pid, read from /proc"""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:  # No procfs; only the direct child can be found
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:  # Exited while scanning
+            continue
+        # The command name may contain spaces or parens; ppid follows the last ')'
+        ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    
+    descendants, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+
+def _kill_process_tree(pid: int):
+    """SIGKILL a process and all its descendants
+    
+    Commands stay in the shell's process group so they keep the controlling
+    terminal (sudo, ssh and passwd open /dev/tty); the tree is collected
+    before killing so no process is reparented away from it first.
+    """
+    for target in [pid] + _descendant_pids(pid):
+        try:
+            os.kill(target, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
 class GPTShell:
     def __init__(self):
         """Initialize the GPT Shell with OpenAI client"""
@@ -20,6 +111,24 @@ class GPTShell:
         self.current_dir = os.getcwd()
         self.username = os.getenv('USER', 'user')
         self.hostname = os.uname().nodename
+        self.home = os.path.expanduser('~')
+        
+        # Per-request LLM context; only the cwd changes between calls, so it
+        # goes last to keep the longest stable prefix for provider prompt caching
+        self.context_template = (
+            f"Operating System: {os.uname().sysname}\n"
+            "Current directory: {cwd}\n"
+        )
+        
+        # Exact-match cache: md5(cwd|normalized input) -> result
+        self.exact_cache = OrderedDict()
+        self.exact_cache_size = 1000
+        
+        # Semantic cache: (unit embedding, cwd, result) for repeat phrasings
+        self.semantic_cache = []
+        self.semantic_cache_size = 100
+        self.semantic_threshold = 0.87
+        self.embedding_model = "text-embedding-3-small"
         
         # Dangerous commands that require confirmation
         self.dangerous_commands = [
@@ -28,6 +137,14 @@ class GPTShell:
             'kill -9', 'killall', ':(){:|:&};:', # fork bomb
         ]
         
+        # Single-pass matcher over all dangerous patterns
+        self.danger_automaton = None
+        if ahocorasick is not None:
+            self.danger_automaton = ahocorasick.Automaton()
+            for pattern in self.dangerous_commands:
+                self.danger_automaton.add_word(pattern, pattern)
+            self.danger_automaton.make_automaton()
+        
         # System prompt for the LLM
         self.system_prompt = """You are GPT-OS, an intelligent Linux shell assistant. Your role is to:
 
@@ -37,20 +154,15 @@ class GPTShell:
 4. Support multiple languages and accents
 5. Be conversational and helpful
 
-When responding, use this JSON format:
-{
-    "command": "the actual shell command to execute",
-    "explanation": "human-friendly explanation of what this does",
-    "warning": "warning message if dangerous, otherwise null",
-    "safe": true/false
-}
-
 Examples:
 - "update my software" → {"command": "sudo apt update && sudo apt upgrade -y", "explanation": "This updates your package lists and upgrades all installed packages", "warning": null, "safe": true}
 - "delete everything in this folder" → {"command": "rm -rf *", "explanation": "This permanently deletes all files and folders in the current directory", "warning": "⚠️ This is DESTRUCTIVE and cannot be undone!", "safe": false}
-- "show me large files" → {"command": "du -ah . | sort -rh | head -20", "explanation": "This shows the 20 largest files and folders in the current directory", "warning": null, "safe": true}
-
-Always respond ONLY with valid JSON. No additional text."""
+- "show me large files" → {"command": "du -ah . | sort -rh | head -20", "explanation": "This shows the 20 largest files and folders in the current directory", "warning": null, "safe": true}"""
+        
+        # Built once and byte-identical across requests so the provider can
+        # serve it from its prompt prefix cache; dynamic context goes in the
+        # user message only
+        self.system_message = {"role": "system", "content": self.system_prompt}
 
     def print_banner(self):
         """Display the GPT-OS welcome banner"""
@@ -68,41 +180,141 @@ Always respond ONLY with valid JSON. No additional text."""
     def get_prompt(self) -> str:
         """Generate the shell prompt"""
         cwd = os.getcwd()
-        home = os.path.expanduser('~')
-        if cwd.startswith(home):
-            cwd = '~' + cwd[len(home):]
+        if cwd.startswith(self.home):
+            cwd = '~' + cwd[len(self.home):]
         return f"\n🤖 {self.username}@{self.hostname}:{cwd}$ "
 
     def parse_llm_response(self, response: str) -> Optional[dict]:
         """Parse the LLM JSON response"""
-        try:
-            # Try to extract JSON from the response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+        # Extract the first balanced JSON object, ignoring braces inside strings
+        start = response.find('{')
+        if start < 0:
             return None
-        except json.JSONDecodeError:
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(response)):
+            c = response[i]
+            if escaped:
+                escaped = False
+            elif c == '\\' and in_string:
+                escaped = True
+            elif c == '"':
+                in_string = not in_string
+            elif in_string:
+                continue
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return json.loads(response[start:i + 1])
+                    except json.JSONDecodeError:
+                        return None
+        return None
+
+    def embed(self, text: str) -> Optional[list]:
+        """Get a unit-length embedding for text, or None if unavailable"""
+        if not getattr(self.client, 'embeddings', None):
             return None
+        try:
+            response = self.client.embeddings.create(
+                model=self.embedding_model,
+                input=text
+            )
+            vector = response.data[0].embedding
+        except Exception:
+            return None
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else None
+
+    def semantic_lookup(self, vector: list, cwd: str) -> Optional[dict]:
+        """Return the cached result for the most similar earlier request"""
+        best_score, best_result = 0.0, None
+        for cached_vector, cached_cwd, result in self.semantic_cache:
+            if cached_cwd != cwd:
+                continue
+            score = sum(map(operator.mul, vector, cached_vector))
+            if score > best_score:
+                best_score, best_result = score, result
+        if best_score >= self.semantic_threshold:
+            return best_result
+        return None
 
-    def translate_to_command(self, user_input: str) -> Optional[dict]:
-        """Translate natural language to shell command using LLM"""
+    def semantic_store(self, vector: list, cwd: str, result: dict):
+        """Remember a translation, dropping the oldest when full"""
+        if len(self.semantic_cache) >= self.semantic_cache_size:
+            self.semantic_cache.pop(0)
+        self.semantic_cache.append((vector, cwd, result))
+
+    def exact_store(self, key: str, result: dict):
+        """Remember a translation under its exact key, evicting the oldest"""
+        self.exact_cache[key] = result
+        self.exact_cache.move_to_end(key)
+        if len(self.exact_cache) > self.exact_cache_size:
+            self.exact_cache.popitem(last=False)
+
+    def translate_to_command(self, user_input: str,
+                             on_token: Optional[Callable[[str], None]] = None) -> Optional[dict]:
+        """Translate natural language to shell command using LLM
+        
+        If on_token is given, the response is streamed and each token is
+        passed to it as soon as it arrives.
+        """
         try:
+            cwd = os.getcwd()
+            
+            # Exact repeats skip both the embedding and LLM calls. Only
+            # whitespace is normalized: paths and names are case-sensitive
+            normalized = ' '.join(user_input.split())
+            key = hashlib.md5(f"{cwd}|{normalized}".encode()).hexdigest()
+            if key in self.exact_cache:
+                self.exact_cache.move_to_end(key)
+                return self.exact_cache[key]
+            
+            # Reuse the answer for a similarly phrased earlier request
+            vector = self.embed(user_input)
+            if vector is not None:
+                cached = self.semantic_lookup(vector, cwd)
+                if cached:
+                    return cached
+            
             # Add context about current directory
-            context = f"Current directory: {os.getcwd()}\n"
-            context += f"Operating System: {os.uname().sysname}\n"
+            context = self.context_template.format(cwd=cwd)
             
             response = self.client.chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
-                    {"role": "system", "content": self.system_prompt},
+                    self.system_message,
                     {"role": "user", "content": context + user_input}
                 ],
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=500,
+                response_format=COMMAND_RESPONSE_FORMAT,
+                stream=True
             )
             
-            llm_output = response.choices[0].message.content
-            return self.parse_llm_response(llm_output)
+            parts = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+            
+            llm_output = ''.join(parts)
+            try:
+                result = json.loads(llm_output)
+            except json.JSONDecodeError:
+                result = self.parse_llm_response(llm_output)
+            if result:
+                self.exact_store(key, result)
+                if vector is not None:
+                    self.semantic_store(vector, cwd, result)
+            return result
             
         except Exception as e:
             print(f"❌ Error communicating with AI: {str(e)}")
@@ -110,24 +322,74 @@ Always respond ONLY with valid JSON. No additional text."""
 
     def is_dangerous(self, command: str) -> bool:
         """Check if a command is potentially dangerous"""
-        for dangerous in self.dangerous_commands:
-            if dangerous in command.lower():
-                return True
-        return False
+        command = command.lower()
+        if self.danger_automaton is not None:
+            return next(self.danger_automaton.iter(command), None) is not None
+        return any(dangerous in command for dangerous in self.dangerous_commands)
 
-    def execute_command(self, command: str) -> Tuple[int, str, str]:
-        """Execute a shell command and return exit code, stdout, stderr"""
+    def execute_command(self, command: str,
+                        on_line: Optional[Callable[[str], None]] = None) -> Tuple[int, str, str]:
+        """Execute a shell command and return exit code, stdout, stderr
+        
+        Output is read line by line as it is produced and only the last
+        MAX_OUTPUT_LINES lines of each stream are kept. If on_line is given,
+        it receives every stdout line as soon as it arrives.
+        """
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
+            # Simple commands skip the extra /bin/sh fork and parse
+            args, use_shell = command, True
+            if SHELL_METACHARACTERS.isdisjoint(command):
+                argv = shlex.split(command)
+                if argv and '=' not in argv[0] and shutil.which(argv[0]):
+                    args, use_shell = argv, False
+            
+            process = subprocess.Popen(
+                args,
+                shell=use_shell,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=30
+                errors='replace',
+                bufsize=1
+            )
+            
+            # Killing only /bin/sh would leave the rest of a pipeline
+            # running and holding the pipes open
+            timed_out = threading.Event()
+            
+            def kill_on_timeout():
+                timed_out.set()
+                _kill_process_tree(process.pid)
+            
+            timer = threading.Timer(COMMAND_TIMEOUT, kill_on_timeout)
+            timer.start()
+            
+            # Drain stderr in the background so neither pipe can fill up
+            stderr_lines = deque(maxlen=MAX_OUTPUT_LINES)
+            stderr_reader = threading.Thread(
+                target=stderr_lines.extend, args=(process.stderr,), daemon=True
             )
-            return result.returncode, result.stdout, result.stderr
-        except subprocess.TimeoutExpired:
-            return -1, "", "Command timed out after 30 seconds"
+            stderr_reader.start()
+            
+            stdout_lines = deque(maxlen=MAX_OUTPUT_LINES)
+            try:
+                for line in process.stdout:
+                    stdout_lines.append(line)
+                    if on_line:
+                        on_line(line)
+                process.wait()
+                stderr_reader.join()
+            except BaseException:
+                # Don't leave the command running behind an error or Ctrl+C
+                _kill_process_tree(process.pid)
+                process.wait()
+                raise
+            finally:
+                timer.cancel()
+            
+            if timed_out.is_set():
+                return -1, "", f"Command timed out after {COMMAND_TIMEOUT} seconds"
+            return process.returncode, ''.join(stdout_lines), ''.join(stderr_lines)
         except Exception as e:
             return -1, "", str(e)
 
@@ -213,10 +475,26 @@ Always respond ONLY with valid JSON. No additional text."""
             print(f"   → {entry['command']}")
             print()
 
-    def format_output(self, stdout: str, stderr: str, exit_code: int):
-        """Format command output for display"""
+    def run_and_display(self, command: str) -> int:
+        """Execute a command, printing stdout while it runs"""
+        started = False
+        
+        def show_line(line: str):
+            nonlocal started
+            if not started:
+                started = True
+                print("\n📤 Output:")
+                print("─" * 70)
+            print(line, end='')
+        
+        exit_code, stdout, stderr = self.execute_command(command, on_line=show_line)
+        self.format_output(stdout, stderr, exit_code, streamed=started)
+        return exit_code
+
+    def format_output(self, stdout: str, stderr: str, exit_code: int, streamed: bool = False):
+        """Format command output for display (stdout is skipped if already streamed)"""
         if exit_code == 0:
-            if stdout.strip():
+            if stdout.strip() and not streamed:
                 print("\n✅ Output:")
                 print("─" * 70)
                 print(stdout)
@@ -247,13 +525,24 @@ Always respond ONLY with valid JSON. No additional text."""
                 if user_input.startswith('!'):
                     command = user_input[1:].strip()
                     print(f"\n🔧 Executing: {command}")
-                    exit_code, stdout, stderr = self.execute_command(command)
-                    self.format_output(stdout, stderr, exit_code)
+                    self.run_and_display(command)
                     continue
                 
-                # Translate natural language to command
+                # Translate natural language to command, showing tokens as they arrive
                 print("\n🤔 Thinking...")
-                result = self.translate_to_command(user_input)
+                streamed = []
+                
+                def show_token(token):
+                    if not streamed:
+                        print("\n💡 I understand! Here's what I'll do:")
+                        print("─" * 70)
+                    streamed.append(token)
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                
+                result = self.translate_to_command(user_input, on_token=show_token)
+                if streamed:
+                    print("\n" + "─" * 70)
                 
                 if not result:
                     print("❌ Sorry, I couldn't understand that. Try rephrasing or use '!' for direct commands.")
@@ -265,8 +554,9 @@ Always respond ONLY with valid JSON. No additional text."""
                 safe = result.get('safe', True)
                 
                 # Display the command and explanation
-                print("\n💡 I understand! Here's what I'll do:")
-                print("─" * 70)
+                if not streamed:
+                    print("\n💡 I understand! Here's what I'll do:")
+                    print("─" * 70)
                 print(f"Command: {command}")
                 print(f"Explanation: {explanation}")
                 
@@ -287,7 +577,7 @@ Always respond ONLY with valid JSON. No additional text."""
                 
                 # Execute the command
                 print(f"\n⚙️  Executing...")
-                exit_code, stdout, stderr = self.execute_command(command)
+                exit_code = self.run_and_display(command)
                 
                 # Store in history
                 self.history.append({
@@ -296,9 +586,6 @@ Always respond ONLY with valid JSON. No additional text."""
                     'exit_code': exit_code
                 })
                 
-                # Display output
-                self.format_output(stdout, stderr, exit_code)
-                
             except KeyboardInterrupt:
                 print("\n\n⚠️  Interrupted. Type 'exit' to quit.")
                 continue
@@ -9,22 +9,46 @@ import sys
 import asyncio
 import subprocess
 import json
-import re
 import time
 import logging
+import signal
 import hashlib
-from typing import Optional, Tuple, Dict, Any, List
+import codecs
+import concurrent.futures
+import heapq
+from typing import Optional, Tuple, Dict, Any, List, Callable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 from collections import OrderedDict, deque
 from functools import wraps
+from itertools import count, islice
 import random
 
 # Third-party imports
 from openai import AsyncOpenAI
+
+try:
+    import httpx2 as httpx  # HTTP transport used by openai>=3
+except ImportError:
+    import httpx
 import gc as python_gc
 
+try:
+    import numpy as np
+except ImportError:  # Semantic cache is disabled without numpy
+    np = None
+
+try:
+    import orjson
+except ImportError:  # Structured logs fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # Fall back to per-pattern substring checks
+    ahocorasick = None
+
 # Local imports
 from input_validator import InputValidator, ValidationResult
 
@@ -35,10 +59,20 @@ from input_validator import InputValidator, ValidationResult
 # Metrics constants
 MAX_HISTOGRAM_SIZE = 1000
 MAX_OUTPUT_LINES_DEFAULT = 1000
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read from a command pipe at a time
+STREAM_MAX_LINE_CHARS = 8 * 1024  # longer output lines are cut to this
 
 # Cache constants
 DEFAULT_CACHE_SIZE = 1000
 DEFAULT_CACHE_TTL = 3600  # 1 hour in seconds
+DEFAULT_SEMANTIC_THRESHOLD = 0.87  # cosine similarity for a semantic hit
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+INT8_SCALE = 127  # unit-vector components map to [-127, 127]
+
+# LLM connection pool constants
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 32
+DEFAULT_KEEPALIVE_EXPIRY = 30  # seconds
 
 # Circuit Breaker constants
 DEFAULT_FAILURE_THRESHOLD = 5
@@ -61,6 +95,37 @@ DEFAULT_QUEUE_SIZE = 100
 # Memory Management constants
 DEFAULT_MAX_HISTORY = 1000
 DEFAULT_GC_INTERVAL = 300  # 5 minutes in seconds
+DEFAULT_GC_GEN0_THRESHOLD = 50_000  # allocations before an automatic gen-0 pass
+DEFAULT_GC_FULL_EVERY = 10  # periodic passes between full collections
+
+# LLM structured output schema; the API guarantees responses match it
+COMMAND_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "shell_command",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "command": {
+                    "type": "string",
+                    "description": "the actual shell command to execute"
+                },
+                "explanation": {
+                    "type": "string",
+                    "description": "human-friendly explanation of what this does"
+                },
+                "warning": {
+                    "type": ["string", "null"],
+                    "description": "warning message if dangerous, otherwise null"
+                },
+                "safe": {"type": "boolean"}
+            },
+            "required": ["command", "explanation", "warning", "safe"],
+            "additionalProperties": False
+        }
+    }
+}
 
 # ============================================================================
 # CONFIGURATION MANAGEMENT
@@ -75,6 +140,9 @@ class Config:
     llm_timeout: int = 10
     llm_max_tokens: int = 500
     llm_temperature: float = 0.3
+    llm_max_connections: int = DEFAULT_MAX_CONNECTIONS
+    llm_max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+    llm_keepalive_expiry: int = DEFAULT_KEEPALIVE_EXPIRY
     
     # Fallback Models
     fallback_models: List[str] = field(default_factory=lambda: ["gpt-4.1-nano", "gemini-2.5-flash"])
@@ -97,6 +165,12 @@ class Config:
     cache_max_size: int = DEFAULT_CACHE_SIZE
     cache_ttl: int = DEFAULT_CACHE_TTL
     
+    # Semantic Cache
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = DEFAULT_SEMANTIC_THRESHOLD
+    semantic_cache_int8: bool = False  # 4x smaller embedding table, ~0.01 score error
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL
+    
     # Rate Limiting
     rate_limit_enabled: bool = True
     rate_limit_requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE
@@ -106,10 +180,14 @@ class Config:
     task_queue_workers: int = DEFAULT_WORKERS
     task_queue_max_size: int = DEFAULT_QUEUE_SIZE
     task_queue_timeout: int = 300
+    task_queue_use_priority: bool = False  # FIFO unless priorities are actually used
     
     # Memory Management
     memory_max_history: int = DEFAULT_MAX_HISTORY
     memory_gc_interval: int = DEFAULT_GC_INTERVAL
+    memory_gc_gen0_threshold: int = DEFAULT_GC_GEN0_THRESHOLD
+    memory_gc_freeze: bool = True
+    memory_gc_full_every: int = DEFAULT_GC_FULL_EVERY
     memory_cache_max_mb: int = 100
     
     # Command Execution
@@ -135,6 +213,8 @@ class Config:
             config.log_level = os.getenv('GPTOS_LOG_LEVEL')
         if os.getenv('GPTOS_CACHE_ENABLED'):
             config.cache_enabled = os.getenv('GPTOS_CACHE_ENABLED').lower() == 'true'
+        if os.getenv('GPTOS_GC_FREEZE'):
+            config.memory_gc_freeze = os.getenv('GPTOS_GC_FREEZE').lower() == 'true'
             
         return config
 
@@ -143,6 +223,21 @@ class Config:
 # STRUCTURED LOGGING
 # ============================================================================
 
+def _json_dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize to a JSON string (two-space indented if pretty)"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(obj, default=str, option=option).decode()
+    return json.dumps(obj, default=str, indent=2 if pretty else None)
+
+
+def _json_loads(data: str) -> Any:
+    """Parse a JSON string; raises json.JSONDecodeError on bad input"""
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError subclasses it
+    return json.loads(data)
+
+
 class StructuredLogger:
     """JSON-based structured logging"""
     
@@ -156,8 +251,15 @@ class StructuredLogger:
             handler.setFormatter(logging.Formatter('%(message)s'))
             self.logger.addHandler(handler)
         
+    def is_enabled_for(self, level: str) -> bool:
+        """Check whether messages at level would be emitted"""
+        return self.logger.isEnabledFor(getattr(logging, level))
+    
     def _log(self, level: str, event: str, **kwargs: Any) -> None:
         """Log structured message"""
+        if not self.is_enabled_for(level):
+            return
+        
         log_entry = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "level": level,
@@ -166,15 +268,15 @@ class StructuredLogger:
         }
         
         if level == "DEBUG":
-            self.logger.debug(json.dumps(log_entry))
+            self.logger.debug(_json_dumps(log_entry))
         elif level == "INFO":
-            self.logger.info(json.dumps(log_entry))
+            self.logger.info(_json_dumps(log_entry))
         elif level == "WARNING":
-            self.logger.warning(json.dumps(log_entry))
+            self.logger.warning(_json_dumps(log_entry))
         elif level == "ERROR":
-            self.logger.error(json.dumps(log_entry))
+            self.logger.error(_json_dumps(log_entry))
         elif level == "CRITICAL":
-            self.logger.critical(json.dumps(log_entry))
+            self.logger.critical(_json_dumps(log_entry))
     
     def debug(self, event: str, **kwargs: Any) -> None:
         """Log debug message"""
@@ -201,13 +303,63 @@ class StructuredLogger:
 # METRICS COLLECTION
 # ============================================================================
 
+class Histogram:
+    """Sliding window of observations with O(1) count/min/max/avg"""
+    
+    def __init__(self, max_size: int = MAX_HISTOGRAM_SIZE):
+        self.values: deque = deque(maxlen=max_size)
+        self.total = 0.0
+        self._seen = 0
+        # Monotonic queues of (index, value) for sliding-window min/max
+        self._min_window: deque = deque()
+        self._max_window: deque = deque()
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def add(self, value: float):
+        """Append an observation, evicting the oldest when full"""
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        
+        index = self._seen
+        self._seen += 1
+        oldest = self._seen - len(self.values)
+        
+        while self._min_window and self._min_window[-1][1] >= value:
+            self._min_window.pop()
+        self._min_window.append((index, value))
+        if self._min_window[0][0] < oldest:
+            self._min_window.popleft()
+        
+        while self._max_window and self._max_window[-1][1] <= value:
+            self._max_window.pop()
+        self._max_window.append((index, value))
+        if self._max_window[0][0] < oldest:
+            self._max_window.popleft()
+    
+    def summary(self) -> Dict[str, float]:
+        """Get count/min/max/avg without scanning the window"""
+        count = len(self.values)
+        if not count:
+            return {"count": 0, "min": 0, "max": 0, "avg": 0}
+        return {
+            "count": count,
+            "min": self._min_window[0][1],
+            "max": self._max_window[0][1],
+            "avg": self.total / count
+        }
+
+
 class Metrics:
     """In-memory metrics collection"""
     
     def __init__(self):
         self.counters: Dict[str, int] = {}
         self.gauges: Dict[str, float] = {}
-        self.histograms: Dict[str, List[float]] = {}
+        self.histograms: Dict[str, Histogram] = {}
         
     def increment(self, name: str, value: int = 1) -> None:
         """Increment counter by value"""
@@ -220,12 +372,24 @@ class Metrics:
     def observe(self, name: str, value: float) -> None:
         """Record histogram observation for latency/duration metrics"""
         if name not in self.histograms:
-            self.histograms[name] = []
-        self.histograms[name].append(value)
-        
-        # Keep only last MAX_HISTOGRAM_SIZE observations
-        if len(self.histograms[name]) > MAX_HISTOGRAM_SIZE:
-            self.histograms[name] = self.histograms[name][-MAX_HISTOGRAM_SIZE:]
+            # Keeps only the last MAX_HISTOGRAM_SIZE observations
+            self.histograms[name] = Histogram(MAX_HISTOGRAM_SIZE)
+        self.histograms[name].add(value)
+    
+    def record_batch(self, observations: Optional[Dict[str, float]] = None,
+                     increments: Optional[Dict[str, int]] = None) -> None:
+        """Record several observations and counter increments in one call"""
+        if observations:
+            histograms = self.histograms
+            for name, value in observations.items():
+                histogram = histograms.get(name)
+                if histogram is None:
+                    histogram = histograms[name] = Histogram(MAX_HISTOGRAM_SIZE)
+                histogram.add(value)
+        if increments:
+            counters = self.counters
+            for name, value in increments.items():
+                counters[name] = counters.get(name, 0) + value
     
     def get_stats(self) -> Dict[str, Any]:
         """Get all metrics"""
@@ -233,13 +397,8 @@ class Metrics:
             "counters": self.counters,
             "gauges": self.gauges,
             "histograms": {
-                name: {
-                    "count": len(values),
-                    "min": min(values) if values else 0,
-                    "max": max(values) if values else 0,
-                    "avg": sum(values) / len(values) if values else 0
-                }
-                for name, values in self.histograms.items()
+                name: histogram.summary()
+                for name, histogram in self.histograms.items()
             }
         }
 
@@ -265,8 +424,8 @@ class CircuitBreaker:
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.success_count = 0
-        self.last_failure_time: Optional[datetime] = None
-        self.last_state_change: datetime = datetime.now()
+        self.last_failure_time: Optional[float] = None  # time.monotonic()
+        self.last_state_change: float = time.monotonic()
         
     def should_allow_request(self) -> bool:
         """Check if request should be allowed"""
@@ -278,8 +437,8 @@ class CircuitBreaker:
         
         if self.state == CircuitState.OPEN:
             # Check if recovery timeout has passed
-            if self.last_failure_time:
-                elapsed = (datetime.now() - self.last_failure_time).total_seconds()
+            if self.last_failure_time is not None:
+                elapsed = time.monotonic() - self.last_failure_time
                 if elapsed >= self.config.circuit_breaker_recovery_timeout:
                     self._transition_to_half_open()
                     return True
@@ -301,7 +460,7 @@ class CircuitBreaker:
     
     def record_failure(self):
         """Record failed request"""
-        self.last_failure_time = datetime.now()
+        self.last_failure_time = time.monotonic()
         
         if self.state == CircuitState.HALF_OPEN:
             self._transition_to_open()
@@ -313,7 +472,7 @@ class CircuitBreaker:
     def _transition_to_open(self):
         """Transition to OPEN state"""
         self.state = CircuitState.OPEN
-        self.last_state_change = datetime.now()
+        self.last_state_change = time.monotonic()
         self.logger.warning("circuit_breaker_opened", 
                           failure_count=self.failure_count)
         self.metrics.set_gauge("circuit_breaker_state", 1)  # OPEN
@@ -322,7 +481,7 @@ class CircuitBreaker:
         """Transition to HALF_OPEN state"""
         self.state = CircuitState.HALF_OPEN
         self.success_count = 0
-        self.last_state_change = datetime.now()
+        self.last_state_change = time.monotonic()
         self.logger.info("circuit_breaker_half_opened")
         self.metrics.set_gauge("circuit_breaker_state", 0.5)  # HALF_OPEN
     
@@ -331,7 +490,7 @@ class CircuitBreaker:
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.success_count = 0
-        self.last_state_change = datetime.now()
+        self.last_state_change = time.monotonic()
         self.logger.info("circuit_breaker_closed")
         self.metrics.set_gauge("circuit_breaker_state", 0)  # CLOSED
 
@@ -340,17 +499,16 @@ class CircuitBreaker:
 # CACHING LAYER
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class CacheEntry:
     """Cache entry with TTL"""
     value: Any
-    timestamp: datetime
+    timestamp: float  # time.monotonic() at insertion
     ttl: int
     
     def is_expired(self) -> bool:
         """Check if entry is expired"""
-        elapsed = (datetime.now() - self.timestamp).total_seconds()
-        return elapsed >= self.ttl
+        return (time.monotonic() - self.timestamp) >= self.ttl
 
 
 class LRUCache:
@@ -361,18 +519,20 @@ class LRUCache:
         self.logger = logger
         self.metrics = metrics
         self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
+        # Min-heap of (expiry_time, key); may hold stale pairs for replaced keys
+        self._expiry_heap: List[Tuple[float, str]] = []
         
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         if not self.config.cache_enabled:
             return None
         
-        if key not in self.cache:
+        # Single C-level dict probe for both the membership test and the fetch
+        entry = self.cache.get(key)
+        if entry is None:
             self.metrics.increment("cache_miss")
             return None
         
-        entry = self.cache[key]
-        
         # Check expiration
         if entry.is_expired():
             del self.cache[key]
@@ -393,30 +553,182 @@ class LRUCache:
         if ttl is None:
             ttl = self.config.cache_ttl
         
-        # Evict if at capacity
-        if len(self.cache) >= self.config.cache_max_size:
+        if key in self.cache:
+            # Overwrite refreshes recency without evicting anything
+            self.cache.move_to_end(key)
+        elif len(self.cache) >= self.config.cache_max_size:
+            # Evict if at capacity
             self.cache.popitem(last=False)  # Remove oldest
             self.metrics.increment("cache_eviction")
         
-        self.cache[key] = CacheEntry(value, datetime.now(), ttl)
+        now = time.monotonic()
+        self.cache[key] = CacheEntry(value, now, ttl)
+        heapq.heappush(self._expiry_heap, (now + ttl, key))
+        
+        # Drop stale heap pairs once they outnumber live entries
+        if len(self._expiry_heap) > 2 * max(len(self.cache), self.config.cache_max_size):
+            self._expiry_heap = [
+                (entry.timestamp + entry.ttl, k) for k, entry in self.cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+        
         self.metrics.set_gauge("cache_size", len(self.cache))
     
     def clear(self):
         """Clear all cache entries"""
         self.cache.clear()
+        self._expiry_heap.clear()
         self.metrics.set_gauge("cache_size", 0)
     
     def cleanup_expired(self):
-        """Remove expired entries"""
-        expired_keys = [k for k, v in self.cache.items() if v.is_expired()]
-        for key in expired_keys:
-            del self.cache[key]
+        """Remove expired entries, visiting only those whose expiry has passed"""
+        now = time.monotonic()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, key = heapq.heappop(self._expiry_heap)
+            entry = self.cache.get(key)
+            # Key may have been replaced with a fresh entry since this push
+            if entry is not None and entry.is_expired():
+                del self.cache[key]
+                removed += 1
         
-        if expired_keys:
-            self.logger.debug("cache_cleanup", removed=len(expired_keys))
+        if removed:
+            self.logger.debug("cache_cleanup", removed=removed)
             self.metrics.set_gauge("cache_size", len(self.cache))
 
 
+class SemanticCache:
+    """Similarity cache keyed by L2-normalized prompt embeddings"""
+    
+    def __init__(self, config: Config, logger: StructuredLogger, metrics: Metrics):
+        self.config = config
+        self.logger = logger
+        self.metrics = metrics
+        
+        # Row index -> entry, in LRU order (oldest first)
+        self.entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        
+        # Preallocated on first insert, once the embedding dimension is known
+        self._embeddings: Optional[Any] = None  # (capacity, dim) float32 or int8
+        self._contexts: Optional[Any] = None    # (capacity,) int64 context hash
+        self._valid: Optional[Any] = None       # (capacity,) bool
+        self._free_rows: List[int] = []
+        self._quantized = False
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether semantic lookups should be attempted"""
+        return (np is not None
+                and self.config.cache_enabled
+                and self.config.semantic_cache_enabled)
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Any:
+        """Convert embedding to a unit-length float32 vector"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+    
+    def _allocate(self, dim: int):
+        """Allocate the embedding matrix as a fixed-size ring of rows"""
+        capacity = self.config.cache_max_size
+        self._quantized = self.config.semantic_cache_int8
+        dtype = np.int8 if self._quantized else np.float32
+        self._embeddings = np.zeros((capacity, dim), dtype=dtype)
+        self._contexts = np.zeros(capacity, dtype=np.int64)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._free_rows = list(range(capacity - 1, -1, -1))
+    
+    def _encode(self, vec: Any) -> Any:
+        """Convert a unit vector to the storage dtype"""
+        if self._quantized:
+            return np.round(vec * INT8_SCALE).astype(np.int8)
+        return vec
+    
+    def _scores(self, query: Any) -> Any:
+        """Cosine similarity of query against every row"""
+        if self._quantized:
+            # Integer dot products with an int32 accumulator, rescaled to [-1, 1]
+            dots = np.einsum('ij,j->i', self._embeddings, self._encode(query), dtype=np.int32)
+            return dots * (1.0 / (INT8_SCALE * INT8_SCALE))
+        # Single matrix-vector product scores every cached prompt
+        return self._embeddings @ query
+    
+    def _release(self, row: int):
+        """Return a row to the free list"""
+        del self.entries[row]
+        self._valid[row] = False
+        self._free_rows.append(row)
+    
+    def get(self, embedding: List[float], context: str) -> Optional[Any]:
+        """Get the value cached for the most similar prompt in the same context"""
+        if not self.enabled or not self.entries:
+            return None
+        
+        query = self._normalize(embedding)
+        if query.shape[0] != self._embeddings.shape[1]:
+            return None
+        
+        scores = self._scores(query)
+        scores[~self._valid | (self._contexts != hash(context))] = -1.0
+        row = int(np.argmax(scores))
+        
+        if scores[row] < self.config.semantic_cache_threshold:
+            self.metrics.increment("semantic_cache_miss")
+            return None
+        
+        entry = self.entries[row]
+        if entry.is_expired():
+            self._release(row)
+            self.metrics.increment("semantic_cache_expired")
+            self.metrics.set_gauge("semantic_cache_size", len(self.entries))
+            return None
+        
+        self.entries.move_to_end(row)
+        self.metrics.increment("semantic_cache_hit")
+        self.logger.debug("semantic_cache_hit", score=float(scores[row]))
+        
+        return entry.value
+    
+    def set(self, embedding: List[float], context: str, value: Any, ttl: Optional[int] = None):
+        """Store value under the given prompt embedding"""
+        if not self.enabled:
+            return
+        
+        if ttl is None:
+            ttl = self.config.cache_ttl
+        
+        vec = self._normalize(embedding)
+        if self._embeddings is None:
+            self._allocate(vec.shape[0])
+        elif vec.shape[0] != self._embeddings.shape[1]:
+            # Embedding model changed; start over with the new dimension
+            self.clear()
+            self._allocate(vec.shape[0])
+        
+        # Evict least recently used row if at capacity
+        if not self._free_rows:
+            oldest = next(iter(self.entries))
+            self._release(oldest)
+            self.metrics.increment("semantic_cache_eviction")
+        
+        row = self._free_rows.pop()
+        self._embeddings[row] = self._encode(vec)
+        self._contexts[row] = hash(context)
+        self._valid[row] = True
+        self.entries[row] = CacheEntry(value, time.monotonic(), ttl)
+        self.metrics.set_gauge("semantic_cache_size", len(self.entries))
+    
+    def clear(self):
+        """Clear all cache entries"""
+        self.entries.clear()
+        self._embeddings = None
+        self._contexts = None
+        self._valid = None
+        self._free_rows = []
+        self.metrics.set_gauge("semantic_cache_size", 0)
+
+
 # ============================================================================
 # RATE LIMITER
 # ============================================================================
@@ -428,23 +740,25 @@ class TokenBucket:
         self.config = config
         self.logger = logger
         self.tokens = config.rate_limit_burst_size
-        self.last_update = time.time()
+        self.last_update = time.monotonic_ns()
         self.rate = config.rate_limit_requests_per_minute / 60.0  # tokens per second
+        
+        # Hoisted for the per-request refill
+        self._burst = config.rate_limit_burst_size
+        self._rate_ns = config.rate_limit_requests_per_minute / 60_000_000_000  # tokens per ns
+    
+    def _refill(self):
+        """Add tokens based on elapsed time"""
+        now = time.monotonic_ns()
+        self.tokens = min(self._burst, self.tokens + (now - self.last_update) * self._rate_ns)
+        self.last_update = now
     
     def allow_request(self) -> bool:
         """Check if request is allowed"""
         if not self.config.rate_limit_enabled:
             return True
         
-        now = time.time()
-        elapsed = now - self.last_update
-        
-        # Add tokens based on elapsed time
-        self.tokens = min(
-            self.config.rate_limit_burst_size,
-            self.tokens + elapsed * self.rate
-        )
-        self.last_update = now
+        self._refill()
         
         if self.tokens >= 1:
             self.tokens -= 1
@@ -452,6 +766,18 @@ class TokenBucket:
         
         self.logger.warning("rate_limit_exceeded")
         return False
+    
+    async def acquire(self):
+        """Wait until a request is allowed, then consume a token"""
+        if not self.config.rate_limit_enabled:
+            return
+        
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
 
 
 # ============================================================================
@@ -519,7 +845,7 @@ class MemoryManager:
         self.logger = logger
         self.metrics = metrics
         self.history: deque = deque(maxlen=config.memory_max_history)
-        self.last_gc = time.time()
+        self.last_gc = time.monotonic()
     
     def add_to_history(self, entry: Dict[str, Any]):
         """Add entry to history with automatic size management"""
@@ -527,9 +853,12 @@ class MemoryManager:
         self.metrics.set_gauge("history_size", len(self.history))
     
     def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Get history entries"""
+        """Get history entries (the most recent `limit` when given)"""
         if limit:
-            return list(self.history)[-limit:]
+            # Walk back from the right end so only `limit` entries are touched
+            recent = list(islice(reversed(self.history), limit))
+            recent.reverse()
+            return recent
         return list(self.history)
     
     def clear_history(self):
@@ -539,15 +868,22 @@ class MemoryManager:
     
     async def periodic_gc(self):
         """Periodic garbage collection"""
+        cycle = 0
         while True:
             await asyncio.sleep(self.config.memory_gc_interval)
+            cycle += 1
             
-            # Force Python garbage collection
-            collected = python_gc.collect()
+            # Young generations most passes; a full sweep only every Nth pass
+            # (cheap once startup objects are frozen)
+            generation = 2 if cycle % self.config.memory_gc_full_every == 0 else 1
+            collected = python_gc.collect(generation)
             
-            self.logger.debug("garbage_collection", 
-                            objects_collected=collected,
-                            history_size=len(self.history))
+            if self.logger.is_enabled_for("DEBUG"):
+                self.logger.debug("garbage_collection", 
+                                generation=generation,
+                                objects_collected=collected,
+                                generation_counts=python_gc.get_count(),
+                                history_size=len(self.history))
             self.metrics.increment("gc_runs")
 
 
@@ -560,16 +896,32 @@ class LLMService:
     
     def __init__(self, config: Config, logger: StructuredLogger, 
                  metrics: Metrics, circuit_breaker: CircuitBreaker,
-                 cache: LRUCache, rate_limiter: TokenBucket):
+                 cache: LRUCache, rate_limiter: TokenBucket,
+                 semantic_cache: Optional[SemanticCache] = None):
         self.config = config
         self.logger = logger
         self.metrics = metrics
         self.circuit_breaker = circuit_breaker
         self.cache = cache
         self.rate_limiter = rate_limiter
+        self.semantic_cache = semantic_cache
         
-        self.client = AsyncOpenAI()
+        # One pooled HTTP client so TLS connections are kept alive across calls
+        self._http = httpx.AsyncClient(
+            timeout=config.llm_timeout,
+            limits=httpx.Limits(
+                max_connections=config.llm_max_connections,
+                max_keepalive_connections=config.llm_max_keepalive_connections,
+                keepalive_expiry=config.llm_keepalive_expiry
+            )
+        )
+        self.client = AsyncOpenAI(http_client=self._http)
         self.system_prompt = self._build_system_prompt()
+        self._system_msg = {"role": "system", "content": self.system_prompt}
+    
+    async def aclose(self):
+        """Close pooled HTTP connections"""
+        await self._http.aclose()
     
     def _build_system_prompt(self) -> str:
         """Build system prompt for LLM"""
@@ -581,44 +933,44 @@ class LLMService:
 4. Support multiple languages and accents
 5. Be conversational and helpful
 
-When responding, use this JSON format:
-{
-    "command": "the actual shell command to execute",
-    "explanation": "human-friendly explanation of what this does",
-    "warning": "warning message if dangerous, otherwise null",
-    "safe": true/false
-}
-
 Examples:
 - "update my software" → {"command": "sudo apt update && sudo apt upgrade -y", "explanation": "This updates your package lists and upgrades all installed packages", "warning": null, "safe": true}
 - "delete everything in this folder" → {"command": "rm -rf *", "explanation": "This permanently deletes all files and folders in the current directory", "warning": "⚠️ This is DESTRUCTIVE and cannot be undone!", "safe": false}
-- "show me large files" → {"command": "du -ah . | sort -rh | head -20", "explanation": "This shows the 20 largest files and folders in the current directory", "warning": null, "safe": true}
-
-Always respond ONLY with valid JSON. No additional text."""
+- "show me large files" → {"command": "du -ah . | sort -rh | head -20", "explanation": "This shows the 20 largest files and folders in the current directory", "warning": null, "safe": true}"""
     
     def _generate_cache_key(self, user_input: str, context: str) -> str:
-        """Generate cache key from input"""
+        """Generate cache key from input and context"""
         combined = f"{user_input}:{context}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        return hashlib.blake2b(combined.encode(), digest_size=16).hexdigest()
     
-    async def translate_command(self, user_input: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Translate natural language to command with full resilience"""
-        start_time = time.time()
+    async def translate_command(self, user_input: str, context: Dict[str, Any],
+                                on_token: Optional[Callable[[str], None]] = None,
+                                wait_for_rate_limit: bool = False) -> Optional[Dict[str, Any]]:
+        """Translate natural language to command with full resilience
+        
+        on_token, if given, receives each streamed token of a live LLM call.
+        With wait_for_rate_limit, a rate-limited request waits for a token
+        instead of being rejected.
+        """
+        start_time = time.monotonic()
         
         try:
             # Check rate limit
-            if not self.rate_limiter.allow_request():
+            if wait_for_rate_limit:
+                await self.rate_limiter.acquire()
+            elif not self.rate_limiter.allow_request():
                 self.logger.warning("rate_limited", user_input=user_input)
                 return None
             
             # Check cache
-            context_str = json.dumps(context, sort_keys=True)
+            # Context only carries cwd and os (see _call_llm)
+            context_str = f"{context.get('cwd', '')}|{context.get('os', '')}"
             cache_key = self._generate_cache_key(user_input, context_str)
             cached_result = self.cache.get(cache_key)
             
             if cached_result:
                 self.logger.info("cache_hit", user_input=user_input)
-                latency = (time.time() - start_time) * 1000
+                latency = (time.monotonic() - start_time) * 1000
                 self.metrics.observe("translation_latency_ms", latency)
                 return cached_result
             
@@ -628,19 +980,39 @@ Always respond ONLY with valid JSON. No additional text."""
                 # Try fallback
                 return await self._fallback_translation(user_input)
             
+            # Check semantic cache (only on exact-match miss). Embedding is a
+            # call to the same upstream, so skip it while the breaker is probing
+            embedding = None
+            if (self.semantic_cache and self.semantic_cache.enabled
+                    and self.circuit_breaker.state == CircuitState.CLOSED):
+                embedding = await self._embed(user_input)
+                if embedding is not None:
+                    cached_result = self.semantic_cache.get(embedding, context_str)
+                    if cached_result:
+                        # Not promoted to the exact cache: a near match is
+                        # no answer for this exact wording
+                        self.logger.info("semantic_cache_hit", user_input=user_input)
+                        latency = (time.monotonic() - start_time) * 1000
+                        self.metrics.observe("translation_latency_ms", latency)
+                        return cached_result
+            
             # Call LLM with retry
-            result = await self._call_llm_with_retry_wrapper(user_input, context)
+            result = await self._call_llm_with_retry_wrapper(user_input, context, on_token)
             
             if result:
                 # Cache the result
                 self.cache.set(cache_key, result)
+                if embedding is not None:
+                    self.semantic_cache.set(embedding, context_str, result)
                 self.circuit_breaker.record_success()
             else:
                 self.circuit_breaker.record_failure()
             
-            latency = (time.time() - start_time) * 1000
-            self.metrics.observe("translation_latency_ms", latency)
-            self.metrics.increment("translations_total")
+            latency = (time.monotonic() - start_time) * 1000
+            self.metrics.record_batch(
+                {"translation_latency_ms": latency},
+                {"translations_total": 1}
+            )
             
             return result
             
@@ -654,13 +1026,63 @@ Always respond ONLY with valid JSON. No additional text."""
             # Try fallback
             return await self._fallback_translation(user_input)
     
-    async def _call_llm_with_retry_wrapper(self, user_input: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def translate_many(self, inputs: List[str], context: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+        """Translate a batch of inputs concurrently, bounded by task_queue_workers"""
+        semaphore = asyncio.Semaphore(self.config.task_queue_workers)
+        
+        async def translate_one(user_input: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.translate_command(user_input, context, wait_for_rate_limit=True)
+        
+        results = await asyncio.gather(
+            *(translate_one(user_input) for user_input in inputs),
+            return_exceptions=True
+        )
+        
+        translations = []
+        for user_input, result in zip(inputs, results):
+            if isinstance(result, BaseException):
+                self.logger.error("batch_translation_error",
+                                user_input=user_input,
+                                error=str(result))
+                result = None
+            translations.append(result)
+        
+        self.metrics.increment("batch_translations", len(inputs))
+        return translations
+    
+    async def _embed(self, user_input: str) -> Optional[List[float]]:
+        """Embed user input for semantic cache lookup; failures count as a miss"""
+        try:
+            response = await asyncio.wait_for(
+                self.client.embeddings.create(
+                    model=self.config.embedding_model,
+                    input=user_input
+                ),
+                timeout=self.config.llm_timeout
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            self.logger.warning("embedding_failed", error=str(e))
+            self.metrics.increment("embedding_errors")
+            return None
+    
+    async def _call_llm_with_retry_wrapper(self, user_input: str, context: Dict[str, Any],
+                                           on_token: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, Any]]:
         """Call LLM with retry logic wrapper"""
         last_exception = None
         
         for attempt in range(self.config.retry_max_attempts):
+            # Don't keep retrying against an upstream the breaker has opened on
+            if attempt > 0 and not self.circuit_breaker.should_allow_request():
+                self.logger.warning("retry_aborted_circuit_open", attempt=attempt)
+                break
+            
             try:
-                result = await self._call_llm(user_input, context)
+                # Only the first attempt streams; a retry after a stream broke
+                # partway would print a second response after the partial one
+                result = await self._call_llm(user_input, context,
+                                              on_token if attempt == 0 else None)
                 if attempt > 0:
                     self.logger.info("retry_succeeded", attempt=attempt)
                     self.metrics.increment("retry_success")
@@ -693,36 +1115,82 @@ Always respond ONLY with valid JSON. No additional text."""
         
         raise last_exception
     
-    async def _call_llm(self, user_input: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Call LLM without retry logic"""
-        context_str = f"Current directory: {context.get('cwd', '/')}\n"
-        context_str += f"Operating System: {context.get('os', 'Linux')}\n"
+    async def _call_llm(self, user_input: str, context: Dict[str, Any],
+                        on_token: Optional[Callable[[str], None]] = None,
+                        model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Call LLM without retry logic, streaming the response
+        
+        model overrides config.llm_model for this call only.
+        """
+        model = model or self.config.llm_model
+        # The system message is static so the provider's prompt prefix cache
+        # covers it; per-call context lives in the user message, most stable first
+        context_str = f"Operating System: {context.get('os', 'Linux')}\n"
+        context_str += f"Current directory: {context.get('cwd', '/')}\n"
         
-        response = await asyncio.wait_for(
-            self.client.chat.completions.create(
-                model=self.config.llm_model,
+        async def consume_stream() -> str:
+            stream = await self.client.chat.completions.create(
+                model=model,
                 messages=[
-                    {"role": "system", "content": self.system_prompt},
+                    self._system_msg,
                     {"role": "user", "content": context_str + user_input}
                 ],
                 temperature=self.config.llm_temperature,
-                max_tokens=self.config.llm_max_tokens
-            ),
-            timeout=self.config.llm_timeout
-        )
+                max_tokens=self.config.llm_max_tokens,
+                response_format=COMMAND_RESPONSE_FORMAT,
+                stream=True
+            )
+            parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+            return ''.join(parts)
         
-        llm_output = response.choices[0].message.content
+        llm_output = await asyncio.wait_for(consume_stream(), timeout=self.config.llm_timeout)
         return self._parse_llm_response(llm_output)
     
     def _parse_llm_response(self, response: str) -> Optional[Dict[str, Any]]:
         """Parse LLM JSON response"""
+        # Structured output is bare JSON; only fall back to extraction if not
         try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            return None
+            parsed = _json_loads(response)
+            if isinstance(parsed, dict):
+                return parsed
         except json.JSONDecodeError:
+            pass
+        
+        # Extract the first balanced {...}, ignoring braces inside strings
+        start = response.find('{')
+        if start < 0:
             return None
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(response)):
+            c = response[i]
+            if escaped:
+                escaped = False
+            elif c == '\\' and in_string:
+                escaped = True
+            elif c == '"':
+                in_string = not in_string
+            elif in_string:
+                continue
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return _json_loads(response[start:i + 1])
+                    except json.JSONDecodeError:
+                        return None
+        return None
     
     async def _fallback_translation(self, user_input: str) -> Optional[Dict[str, Any]]:
         """Fallback translation using alternative models or rules"""
@@ -734,14 +1202,10 @@ Always respond ONLY with valid JSON. No additional text."""
             try:
                 self.logger.info("trying_fallback_model", model=fallback_model)
                 
-                # Temporarily switch model
-                original_model = self.config.llm_model
-                self.config.llm_model = fallback_model
-                
-                result = await self._call_llm(user_input, {"cwd": os.getcwd(), "os": "Linux"})
-                
-                # Restore original model
-                self.config.llm_model = original_model
+                # Per-call override; the shared config stays untouched
+                result = await self._call_llm(
+                    user_input, {"cwd": os.getcwd(), "os": "Linux"}, model=fallback_model
+                )
                 
                 if result:
                     return result
@@ -765,7 +1229,7 @@ Always respond ONLY with valid JSON. No additional text."""
 # BACKGROUND TASK QUEUE
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """Background task"""
     id: str
@@ -773,7 +1237,7 @@ class Task:
     args: tuple
     kwargs: dict
     priority: int = 0
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at: float = field(default_factory=time.monotonic)
     
     def __lt__(self, other):
         return self.priority < other.priority
@@ -786,9 +1250,16 @@ class TaskQueue:
         self.config = config
         self.logger = logger
         self.metrics = metrics
-        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=config.task_queue_max_size)
+        # A plain FIFO avoids heap pushes and (priority, task) tuples per item;
+        # the PriorityQueue is only worth it when callers pass priorities
+        self.use_priority = config.task_queue_use_priority
+        if self.use_priority:
+            self.queue: asyncio.Queue = asyncio.PriorityQueue(maxsize=config.task_queue_max_size)
+        else:
+            self.queue = asyncio.Queue(maxsize=config.task_queue_max_size)
         self.workers: List[asyncio.Task] = []
         self.running = False
+        self._task_counter = count()  # ids only need to be unique per process
     
     async def start(self):
         """Start worker pool"""
@@ -808,13 +1279,14 @@ class TaskQueue:
         self.logger.info("task_queue_stopped")
     
     async def enqueue(self, func, *args, priority: int = 0, **kwargs) -> str:
-        """Enqueue a task"""
-        task_id = hashlib.md5(f"{time.time()}{random.random()}".encode()).hexdigest()[:8]
+        """Enqueue a task (priority is honoured only with task_queue_use_priority)"""
+        task_id = f"t{next(self._task_counter):x}"
         task = Task(task_id, func, args, kwargs, priority)
         
         try:
+            item = (priority, task) if self.use_priority else task
             await asyncio.wait_for(
-                self.queue.put((priority, task)),
+                self.queue.put(item),
                 timeout=1.0
             )
             self.metrics.increment("tasks_enqueued")
@@ -832,20 +1304,23 @@ class TaskQueue:
         while self.running:
             try:
                 # Get task from queue
-                priority, task = await asyncio.wait_for(
+                item = await asyncio.wait_for(
                     self.queue.get(),
                     timeout=1.0
                 )
+                task = item[1] if self.use_priority else item
                 
                 self.metrics.set_gauge("queue_size", self.queue.qsize())
                 
                 # Execute task
-                start_time = time.time()
+                start_time = time.monotonic()
                 try:
                     await task.func(*task.args, **task.kwargs)
-                    latency = (time.time() - start_time) * 1000
-                    self.metrics.observe("task_duration_ms", latency)
-                    self.metrics.increment("tasks_completed")
+                    latency = (time.monotonic() - start_time) * 1000
+                    self.metrics.record_batch(
+                        {"task_duration_ms": latency},
+                        {"tasks_completed": 1}
+                    )
                     
                 except Exception as e:
                     self.logger.error("task_failed", 
@@ -861,6 +1336,51 @@ class TaskQueue:
                                 error=str(e))
 
 
+# ============================================================================
+# PROCESS MANAGEMENT
+# ============================================================================
+
+def _descendant_pids(pid: int) -> List[int]:
+    """Return the PIDs of every live descendant of pid, read from /proc"""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:  # No procfs; only the direct child can be found
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:  # Exited while scanning
+            continue
+        # The command name may contain spaces or parens; ppid follows the last ')'
+        ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    
+    descendants, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+
+def _kill_process_tree(pid: int):
+    """SIGKILL a process and all its descendants
+    
+    Commands stay in the shell's process group so they keep the controlling
+    terminal (sudo, ssh and passwd open /dev/tty); the tree is collected
+    before killing so no process is reparented away from it first.
+    """
+    for target in [pid] + _descendant_pids(pid):
+        try:
+            os.kill(target, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
 # ============================================================================
 # ENTERPRISE GPT SHELL
 # ============================================================================
@@ -879,27 +1399,46 @@ class EnterpriseGPTShell:
         # Resilience components
         self.circuit_breaker = CircuitBreaker(self.config, self.logger, self.metrics)
         self.cache = LRUCache(self.config, self.logger, self.metrics)
+        self.semantic_cache = SemanticCache(self.config, self.logger, self.metrics)
         self.rate_limiter = TokenBucket(self.config, self.logger)
         self.memory_manager = MemoryManager(self.config, self.logger, self.metrics)
         
         # Services
         self.llm_service = LLMService(
             self.config, self.logger, self.metrics,
-            self.circuit_breaker, self.cache, self.rate_limiter
+            self.circuit_breaker, self.cache, self.rate_limiter,
+            self.semantic_cache
         )
         self.task_queue = TaskQueue(self.config, self.logger, self.metrics)
         
         # State
         self.username = os.getenv('USER', 'user')
-        self.hostname = os.uname().nodename
+        uname = os.uname()
+        self.hostname = uname.nodename
+        # Invariant for the life of the process; looked up once
+        self._os_name = uname.sysname
+        self._home = os.path.expanduser('~')
         self.dangerous_commands = [
             'rm -rf', 'mkfs', 'dd', 'format', 'fdisk',
             'shutdown', 'reboot', 'init 0', 'init 6',
             'kill -9', 'killall', ':(){:|:&};:',
         ]
         
+        # Single-pass matcher over all dangerous patterns
+        self._danger_ac = None
+        if ahocorasick is not None:
+            self._danger_ac = ahocorasick.Automaton()
+            for pattern in self.dangerous_commands:
+                self._danger_ac.add_word(pattern, pattern)
+            self._danger_ac.make_automaton()
+        
         # Background tasks
         self.background_tasks: List[asyncio.Task] = []
+        
+        # The prompt gets its own thread instead of the shared default pool
+        self._input_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='input'
+        )
     
     async def initialize(self):
         """Initialize async components"""
@@ -919,6 +1458,16 @@ class EnterpriseGPTShell:
             asyncio.create_task(self._health_check())
         )
         
+        # Fewer automatic gen-0 passes, and move startup objects (client,
+        # prompts, caches) to the permanent generation so no later
+        # collection rescans them
+        python_gc.set_threshold(self.config.memory_gc_gen0_threshold, 10, 10)
+        if self.config.memory_gc_freeze:
+            python_gc.collect()
+            python_gc.collect()
+            python_gc.freeze()
+            self.logger.info("gc_frozen", objects=python_gc.get_freeze_count())
+        
         self.logger.info("gpt_os_initialized")
     
     async def shutdown(self):
@@ -928,11 +1477,16 @@ class EnterpriseGPTShell:
         # Stop task queue
         await self.task_queue.stop()
         
+        # Release pooled LLM connections
+        await self.llm_service.aclose()
+        
         # Cancel background tasks
         for task in self.background_tasks:
             task.cancel()
         await asyncio.gather(*self.background_tasks, return_exceptions=True)
         
+        self._input_executor.shutdown(wait=False)
+        
         self.logger.info("gpt_os_shutdown_complete")
     
     async def _periodic_cache_cleanup(self):
@@ -946,6 +1500,10 @@ class EnterpriseGPTShell:
         while True:
             await asyncio.sleep(self.config.health_check_interval)
             
+            # The payload is only ever logged at DEBUG
+            if not self.logger.is_enabled_for("DEBUG"):
+                continue
+            
             health = {
                 "status": "healthy",
                 "circuit_breaker": self.circuit_breaker.state.value,
@@ -972,24 +1530,37 @@ class EnterpriseGPTShell:
     def get_prompt(self) -> str:
         """Generate prompt"""
         cwd = os.getcwd()
-        home = os.path.expanduser('~')
+        home = self._home
         if cwd.startswith(home):
             cwd = '~' + cwd[len(home):]
         return f"\n🚀 {self.username}@{self.hostname}:{cwd}$ "
     
     async def translate_and_execute(self, user_input: str):
         """Translate and execute command"""
-        start_time = time.time()
+        start_time = time.monotonic()
         
         try:
             # Translate
             print("\n🤔 Thinking...")
             context = {
                 "cwd": os.getcwd(),
-                "os": os.uname().sysname
+                "os": self._os_name
             }
             
-            result = await self.llm_service.translate_command(user_input, context)
+            # Show tokens as they stream in
+            streamed = []
+            
+            def show_token(token: str):
+                if not streamed:
+                    print("\n💡 I understand! Here's what I'll do:")
+                    print("─" * 70)
+                streamed.append(token)
+                sys.stdout.write(token)
+                sys.stdout.flush()
+            
+            result = await self.llm_service.translate_command(user_input, context, on_token=show_token)
+            if streamed:
+                print("\n" + "─" * 70)
             
             if not result:
                 print("❌ Sorry, I couldn't process that request. Please try again.")
@@ -1001,8 +1572,9 @@ class EnterpriseGPTShell:
             safe = result.get('safe', True)
             
             # Display
-            print("\n💡 I understand! Here's what I'll do:")
-            print("─" * 70)
+            if not streamed:
+                print("\n💡 I understand! Here's what I'll do:")
+                print("─" * 70)
             print(f"Command: {command}")
             print(f"Explanation: {explanation}")
             
@@ -1010,7 +1582,8 @@ class EnterpriseGPTShell:
                 print(f"\n{warning}")
             
             # Confirm
-            if not safe or self._is_dangerous(command):
+            cmd_lower = command.lower()
+            if not safe or self._is_dangerous(cmd_lower):
                 confirm = input("\n⚠️  This command may be dangerous. Execute? (yes/no): ").strip().lower()
             else:
                 confirm = input("\n▶️  Execute this command? (yes/no): ").strip().lower()
@@ -1021,7 +1594,7 @@ class EnterpriseGPTShell:
             
             # Execute
             print(f"\n⚙️  Executing...")
-            exit_code, stdout, stderr = await self._execute_command(command)
+            exit_code = await self._run_and_display(command)
             
             # Store in history
             self.memory_manager.add_to_history({
@@ -1031,11 +1604,8 @@ class EnterpriseGPTShell:
                 'timestamp': datetime.now().isoformat()
             })
             
-            # Display output
-            self._format_output(stdout, stderr, exit_code)
-            
             # Metrics
-            latency = (time.time() - start_time) * 1000
+            latency = (time.monotonic() - start_time) * 1000
             self.metrics.observe("command_total_latency_ms", latency)
             self.metrics.increment("commands_executed")
             
@@ -1043,43 +1613,139 @@ class EnterpriseGPTShell:
             self.logger.error("command_execution_error", error=str(e))
             print(f"\n❌ Error: {str(e)}")
     
-    def _is_dangerous(self, command: str) -> bool:
-        """Check if command is dangerous"""
-        return any(dangerous in command.lower() for dangerous in self.dangerous_commands)
+    def _is_dangerous(self, cmd_lower: str) -> bool:
+        """Check if an already-lowercased command is dangerous"""
+        if self._danger_ac is not None:
+            return next(self._danger_ac.iter(cmd_lower), None) is not None
+        return any(dangerous in cmd_lower for dangerous in self.dangerous_commands)
     
-    async def _execute_command(self, command: str) -> Tuple[int, str, str]:
-        """Execute command asynchronously"""
+    async def _execute_command(self, command: str,
+                               on_line: Optional[Callable[[str], None]] = None) -> Tuple[int, str, str]:
+        """Execute command asynchronously
+        
+        Both pipes are read in chunks while the command runs and decoded
+        incrementally, so a UTF-8 sequence split across reads stays intact
+        and no full-size bytes copy is made. Only the first
+        command_max_output_lines lines of each stream are kept, each cut to
+        STREAM_MAX_LINE_CHARS; the rest is drained and counted so the child
+        never blocks on a full pipe.
+        If on_line is given, it receives each kept stdout line as it arrives.
+        """
+        max_lines = self.config.command_max_output_lines
+        
+        async def read_stream(stream, callback=None) -> str:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            lines = deque(maxlen=max_lines)
+            dropped = 0
+            pending: List[str] = []  # pieces of the current unterminated line
+            pending_len = 0
+            truncated = False
+            
+            def extend(part: str):
+                nonlocal pending_len, truncated
+                room = STREAM_MAX_LINE_CHARS - pending_len
+                if len(part) > room:
+                    part = part[:room]
+                    truncated = True
+                if part:
+                    pending.append(part)
+                    pending_len += len(part)
+            
+            def finish(line_end: str):
+                nonlocal dropped, pending_len, truncated
+                if len(lines) == max_lines:
+                    dropped += 1
+                else:
+                    line = ''.join(pending)
+                    if truncated:
+                        line += " ... (line truncated)"
+                    lines.append(line + line_end)
+                    if callback:
+                        callback(line + line_end)
+                pending.clear()
+                pending_len = 0
+                truncated = False
+            
+            while True:
+                chunk = await stream.read(STREAM_CHUNK_SIZE)
+                # Only the newly decoded text is split, never the pending line
+                text = decoder.decode(chunk, final=not chunk)
+                if text:
+                    *complete, rest = text.split('\n')
+                    for part in complete:
+                        extend(part)
+                        finish('\n')
+                    extend(rest)
+                if not chunk:
+                    if pending:
+                        finish('')
+                    break
+            output = ''.join(lines)
+            if dropped:
+                note = f"\n... ({dropped} more lines)\n"
+                output += note
+                if callback:
+                    callback(note)
+            return output
+        
         try:
             process = await asyncio.create_subprocess_shell(
                 command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=self.config.command_timeout
+        except Exception as e:
+            return -1, "", str(e)
+        
+        readers = asyncio.gather(
+            read_stream(process.stdout, on_line),
+            read_stream(process.stderr),
+            process.wait()
+        )
+        finished = False
+        try:
+            stdout, stderr, _ = await asyncio.wait_for(
+                readers, timeout=self.config.command_timeout
             )
-            
-            return process.returncode, stdout.decode(), stderr.decode()
+            finished = True
+            return process.returncode, stdout, stderr
             
         except asyncio.TimeoutError:
             return -1, "", "Command timed out"
         except Exception as e:
             return -1, "", str(e)
+        finally:
+            if not finished:
+                # Also reached on cancellation (Ctrl+C). Killing only /bin/sh
+                # would leave the rest of a pipeline running
+                _kill_process_tree(process.pid)
+                await process.wait()
+                readers.cancel()
+                await asyncio.gather(readers, return_exceptions=True)
+    
+    async def _run_and_display(self, command: str) -> int:
+        """Execute a command, printing stdout while it runs"""
+        started = False
+        
+        def show_line(line: str):
+            nonlocal started
+            if not started:
+                started = True
+                print("\n✅ Output:")
+                print("─" * 70)
+            print(line, end='')
+        
+        exit_code, stdout, stderr = await self._execute_command(command, on_line=show_line)
+        self._format_output(stdout, stderr, exit_code, streamed=started)
+        return exit_code
     
-    def _format_output(self, stdout: str, stderr: str, exit_code: int):
-        """Format command output"""
+    def _format_output(self, stdout: str, stderr: str, exit_code: int, streamed: bool = False):
+        """Format command output (stdout is skipped if already streamed)"""
         if exit_code == 0:
-            if stdout.strip():
+            if stdout.strip() and not streamed:
                 print("\n✅ Output:")
                 print("─" * 70)
-                lines = stdout.split('\n')
-                if len(lines) > self.config.command_max_output_lines:
-                    print('\n'.join(lines[:self.config.command_max_output_lines]))
-                    print(f"\n... ({len(lines) - self.config.command_max_output_lines} more lines)")
-                else:
-                    print(stdout)
+                print(stdout)
         else:
             print(f"\n❌ Command failed with exit code {exit_code}")
             if stderr.strip():
@@ -1120,7 +1786,7 @@ class EnterpriseGPTShell:
         stats = self.metrics.get_stats()
         print("\n📊 System Statistics:")
         print("─" * 70)
-        print(json.dumps(stats, indent=2))
+        print(_json_dumps(stats, pretty=True))
     
     def show_health(self):
         """Show health status"""
@@ -1132,7 +1798,7 @@ class EnterpriseGPTShell:
         }
         print("\n🏥 Health Status:")
         print("─" * 70)
-        print(json.dumps(health, indent=2))
+        print(_json_dumps(health, pretty=True))
     
     def show_history(self):
         """Show history"""
@@ -1153,11 +1819,12 @@ class EnterpriseGPTShell:
         await self.initialize()
         self.print_banner()
         
+        loop = asyncio.get_running_loop()
         try:
             while True:
                 try:
-                    user_input = await asyncio.get_event_loop().run_in_executor(
-                        None, input, self.get_prompt()
+                    user_input = await loop.run_in_executor(
+                        self._input_executor, input, self.get_prompt()
                     )
                     user_input = user_input.strip()
                     
@@ -1188,8 +1855,7 @@ class EnterpriseGPTShell:
                     if user_input.startswith('!'):
                         command = user_input[1:].strip()
                         print(f"\n🔧 Executing: {command}")
-                        exit_code, stdout, stderr = await self._execute_command(command)
-                        self._format_output(stdout, stderr, exit_code)
+                        await self._run_and_display(command)
                         continue
                     
                     # Translate and execute
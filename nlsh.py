@@ -1,17 +1,130 @@
-import subprocess, os
+import subprocess, os, json, time, mmap, http.client
+from functools import lru_cache
+from input_validator import validator
 
 WHITELIST_PATH = "config/whitelist.txt"
+LLAMA_SERVER = "./llama.cpp/llama-server"
+MODEL_PATH = "models/model.gguf"
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
 
-with open(WHITELIST_PATH, 'r') as f:
-    whitelist = [line.strip() for line in f.readlines() if line.strip()]
+_server = None
+_conn = None
+
+@lru_cache(maxsize=None)
+def load_whitelist():
+    # Read on first use, not at import; a tuple lets startswith check all prefixes in C.
+    # mmap hands the whole file to one C-level splitlines instead of per-line reads
+    with open(WHITELIST_PATH, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ()  # mmap refuses empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = mm.read().splitlines()
+    return tuple({line.strip().decode() for line in lines if line.strip()})
 
 def is_safe(cmd):
-    return any(cmd.startswith(w) for w in whitelist)
+    return cmd.startswith(load_whitelist())
+
+def _request(method, path, body=None):
+    # One keep-alive connection; reconnect once if the server dropped it.
+    # Timeouts and other errors are not retried: a hung generation would
+    # just run again for the full timeout
+    global _conn
+    for attempt in range(2):
+        reused = _conn is not None
+        if not reused:
+            _conn = http.client.HTTPConnection(SERVER_HOST, SERVER_PORT, timeout=120)
+        try:
+            headers = {'Content-Type': 'application/json'} if body else {}
+            _conn.request(method, path, body=body, headers=headers)
+            resp = _conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            _conn.close()
+            _conn = None
+            if attempt or not reused:
+                raise
+        except (http.client.HTTPException, OSError):
+            _conn.close()
+            _conn = None
+            raise
+
+def start_server(timeout=120):
+    # Load the model once so each prompt pays for inference only
+    global _server
+    if _server is not None or not os.path.exists(LLAMA_SERVER):
+        return _server is not None
+    _server = subprocess.Popen(
+        [LLAMA_SERVER, '-m', MODEL_PATH, '-c', '4096', '--port', str(SERVER_PORT)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and _server.poll() is None:
+        try:
+            if _request('GET', '/health')[0] == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    stop_server()
+    return False
+
+def stop_server():
+    global _server, _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+    if _server is not None:
+        _server.terminate()
+        _server.wait()
+        _server = None
+
+def _server_generate(prompt):
+    # Any server failure skips this prompt rather than ending the session
+    body = json.dumps({'prompt': prompt, 'n_predict': 256})
+    try:
+        status, data = _request('POST', '/completion', body)
+    except (OSError, http.client.HTTPException) as e:
+        print(f"\n❌ llama-server unreachable: {e}")
+        return ""
+    if status != 200:
+        print(f"\n❌ llama-server returned HTTP {status}")
+        return ""
+    try:
+        reply = json.loads(data)
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict) or not isinstance(reply.get('content'), str):
+        print("\n❌ llama-server sent an unexpected response")
+        return ""
+    return reply['content'].strip()
+
+def generate(prompt):
+    if _server is not None:
+        return _server_generate(prompt)
+    # No llama-server binary: fall back to a one-shot run (reloads the model).
+    # An argv list skips the shell, so the prompt is never parsed as shell code
+    try:
+        res = subprocess.run(['./llama.cpp/main', '-m', MODEL_PATH, '-p', prompt],
+                             capture_output=True, text=True, timeout=120)
+    except subprocess.TimeoutExpired:
+        print("\n❌ Model timed out.")
+        return ""
+    except OSError as e:
+        print(f"\n❌ Could not run llama.cpp: {e}")
+        return ""
+    return res.stdout.strip()
 
 def run(prompt):
     print("\n⏳ Thinking...")
-    cmd = subprocess.getoutput(f"./llama.cpp/main -m models/model.gguf -p '{prompt}'")
+    cmd = generate(prompt)
+    if not cmd:
+        return
     print(f"\n🤖 Suggested command:\n{cmd}")
+    check = validator.validate(cmd)
+    if not check.is_valid:
+        print(f"\n❌ {check.error_message}. Skipping.")
+        return
     if not is_safe(cmd):
         print("\n❌ Command not whitelisted. Skipping.")
         return
@@ -20,10 +133,15 @@ def run(prompt):
         os.system(cmd)
 
 if __name__ == '__main__':
-    while True:
-        try:
-            prompt = input("\n🧠 GPT-OS:> ")
-            run(prompt)
-        except KeyboardInterrupt:
-            print("\nExiting GPT-OS Shell")
-            break
+    print("\n⏳ Loading model...")
+    start_server()
+    try:
+        while True:
+            try:
+                prompt = input("\n🧠 GPT-OS:> ")
+                run(prompt)
+            except KeyboardInterrupt:
+                print("\nExiting GPT-OS Shell")
+                break
+    finally:
+        stop_server()
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from nlsh import start_server, stop_server, generate
 
 class GPTShellGUI:
     def __init__(self, root):
@@ -11,14 +12,32 @@ class GPTShellGUI:
         self.output = ScrolledText(root, height=20)
         self.output.pack()
         tk.Button(root, text="Run", command=self.execute).pack(pady=5)
+        # Inference runs off the Tk thread; one worker since nlsh shares a single connection
+        self._pool = ThreadPoolExecutor(max_workers=1)
 
     def execute(self):
         prompt = self.input.get()
         self.output.insert(tk.END, f"\n>> {prompt}\n")
-        result = subprocess.getoutput(f"./llama.cpp/main -m models/model.gguf -p \"{prompt}\"")
+        fut = self._pool.submit(generate, prompt)
+        self.root.after(50, self._poll_result, fut)
+
+    def _poll_result(self, fut):
+        # Tk widgets may only be touched from the main thread, so poll from there
+        if not fut.done():
+            self.root.after(50, self._poll_result, fut)
+            return
+        try:
+            result = fut.result()
+        except Exception as e:
+            result = f"Error: {e}"
         self.output.insert(tk.END, result + "\n")
 
 if __name__ == '__main__':
+    start_server()
     root = tk.Tk()
     app = GPTShellGUI(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app._pool.shutdown(wait=False, cancel_futures=True)
+        stop_server()
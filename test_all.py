@@ -6,13 +6,16 @@ Runs all tests and provides detailed report
 
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 
 def run_test_suite(name: str, command: str) -> tuple:
-    """Run a test suite and return results"""
-    print(f"\n{'='*70}")
-    print(f"Running: {name}")
-    print(f"{'='*70}\n")
+    """Run a test suite and return (success, buffered report)
+    
+    Output is collected instead of printed so suites can run concurrently
+    without interleaving their reports.
+    """
+    report = [f"\n{'='*70}", f"Running: {name}", f"{'='*70}\n"]
     
     try:
         result = subprocess.run(
@@ -23,18 +26,18 @@ def run_test_suite(name: str, command: str) -> tuple:
             timeout=60
         )
         
-        print(result.stdout)
+        report.append(result.stdout)
         if result.stderr:
-            print("STDERR:", result.stderr)
+            report.append(f"STDERR: {result.stderr}")
         
-        return (result.returncode == 0, result.stdout)
+        return (result.returncode == 0, "\n".join(report))
     
     except subprocess.TimeoutExpired:
-        print(f"❌ {name} TIMED OUT")
-        return (False, "Timeout")
+        report.append(f"❌ {name} TIMED OUT")
+        return (False, "\n".join(report))
     except Exception as e:
-        print(f"❌ {name} FAILED: {str(e)}")
-        return (False, str(e))
+        report.append(f"❌ {name} FAILED: {str(e)}")
+        return (False, "\n".join(report))
 
 
 def main():
@@ -46,13 +49,22 @@ def main():
     test_suites = [
         ("Enterprise Components", "python3 test_enterprise.py"),
         ("Input Validation", "python3 test_input_validation.py"),
+        ("Shell Command Execution", "python3 test_gpt_shell.py"),
     ]
     
     results = {}
     
-    for name, command in test_suites:
-        success, output = run_test_suite(name, command)
-        results[name] = success
+    # Suites are independent processes; run them all at once and print
+    # each report in suite order as it becomes available
+    with ThreadPoolExecutor(max_workers=len(test_suites)) as executor:
+        futures = [
+            (name, executor.submit(run_test_suite, name, command))
+            for name, command in test_suites
+        ]
+        for name, future in futures:
+            success, report = future.result()
+            print(report)
+            results[name] = success
     
     # Summary
     print("\n" + "="*70)
@@ -5,14 +5,28 @@ Tests all resilience patterns and enterprise features
 """
 
 import asyncio
+import os
+import pty
+import sys
 import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 # Import enterprise components
 from gpt_shell_enterprise import (
-    Config, StructuredLogger, Metrics, CircuitBreaker,
-    CircuitState, LRUCache, TokenBucket, MemoryManager
+    Config, StructuredLogger, Metrics, Histogram, CircuitBreaker,
+    CircuitState, LRUCache, SemanticCache, TokenBucket, MemoryManager,
+    EnterpriseGPTShell, LLMService
 )
+import gpt_shell_enterprise
+
+
+@dataclass(slots=True)
+class _TestRecord:
+    """Single recorded test outcome"""
+    name: str
+    passed: bool
+    message: str = ""
 
 
 class TestResults:
@@ -24,11 +38,7 @@ class TestResults:
     
     def record(self, test_name: str, passed: bool, message: str = ""):
         """Record test result"""
-        self.tests.append({
-            "name": test_name,
-            "passed": passed,
-            "message": message
-        })
+        self.tests.append(_TestRecord(test_name, passed, message))
         if passed:
             self.passed += 1
             print(f"✅ {test_name}: PASSED")
@@ -46,8 +56,8 @@ class TestResults:
         if self.failed > 0:
             print("\nFailed tests:")
             for test in self.tests:
-                if not test["passed"]:
-                    print(f"  - {test['name']}: {test['message']}")
+                if not test.passed:
+                    print(f"  - {test.name}: {test.message}")
 
 
 def test_config():
@@ -90,6 +100,13 @@ def test_structured_logging():
     except Exception as e:
         results.record("Logging: Basic operations", False, str(e))
     
+    # Test level check
+    results.record(
+        "Logging: Level check",
+        logger.is_enabled_for("INFO") and not logger.is_enabled_for("DEBUG"),
+        "INFO logger should emit INFO but not DEBUG"
+    )
+    
     return results
 
 
@@ -129,6 +146,30 @@ def test_metrics():
         f"Count: {hist_stats['count']}, Avg: {hist_stats['avg']}"
     )
     
+    # Test sliding window drops evicted min/max
+    histogram = Histogram(max_size=3)
+    for value in [1, 9, 5, 4, 3]:
+        histogram.add(value)
+    window_stats = histogram.summary()
+    
+    results.record(
+        "Metrics: Histogram sliding window",
+        window_stats == {"count": 3, "min": 3, "max": 5, "avg": 4},
+        f"Got {window_stats}"
+    )
+    
+    # Test batched updates
+    metrics.record_batch({"test_histogram": 400, "batch_histogram": 7}, {"test_counter": 2})
+    stats = metrics.get_stats()
+    
+    results.record(
+        "Metrics: Batch record",
+        stats["counters"]["test_counter"] == 7
+        and stats["histograms"]["test_histogram"]["count"] == 4
+        and stats["histograms"]["batch_histogram"]["avg"] == 7,
+        f"Got {stats}"
+    )
+    
     return results
 
 
@@ -254,6 +295,72 @@ def test_cache():
     return results
 
 
+def test_semantic_cache():
+    """Test embedding-similarity cache"""
+    results = TestResults()
+    
+    if gpt_shell_enterprise.np is None:
+        print("⏭️  Semantic cache tests skipped (numpy not installed)")
+        return results
+    
+    config = Config()
+    config.cache_max_size = 2
+    
+    logger = StructuredLogger("test", "ERROR")
+    metrics = Metrics()
+    cache = SemanticCache(config, logger, metrics)
+    
+    cache.set([1.0, 0.0, 0.0], "ctx", "list files")
+    
+    # Near-duplicate embedding should hit
+    results.record(
+        "Semantic Cache: Similar prompt hit",
+        cache.get([0.95, 0.1, 0.0], "ctx") == "list files",
+        "Expected hit above similarity threshold"
+    )
+    
+    # Dissimilar embedding should miss
+    results.record(
+        "Semantic Cache: Dissimilar prompt miss",
+        cache.get([0.0, 1.0, 0.0], "ctx") is None,
+        "Expected miss below similarity threshold"
+    )
+    
+    # Same embedding under another context should miss
+    results.record(
+        "Semantic Cache: Context isolation",
+        cache.get([1.0, 0.0, 0.0], "other") is None,
+        "Entries should only match their own context"
+    )
+    
+    # LRU eviction at capacity
+    cache.set([0.0, 1.0, 0.0], "ctx", "show disk")
+    cache.get([1.0, 0.0, 0.0], "ctx")  # Touch so "show disk" is oldest
+    cache.set([0.0, 0.0, 1.0], "ctx", "show memory")
+    results.record(
+        "Semantic Cache: LRU eviction",
+        cache.get([1.0, 0.0, 0.0], "ctx") == "list files"
+        and cache.get([0.0, 1.0, 0.0], "ctx") is None
+        and len(cache.entries) == 2,
+        f"Cache size: {len(cache.entries)}"
+    )
+    
+    # int8 storage should keep the same hit/miss decisions
+    config = Config()
+    config.semantic_cache_int8 = True
+    cache = SemanticCache(config, logger, metrics)
+    cache.set([1.0, 0.0, 0.0], "ctx", "list files")
+    results.record(
+        "Semantic Cache: int8 quantized lookup",
+        cache.get([0.95, 0.1, 0.0], "ctx") == "list files"
+        and cache.get([0.0, 1.0, 0.0], "ctx") is None
+        and cache._embeddings.dtype == gpt_shell_enterprise.np.int8,
+        "Quantized cache should hit similar and miss dissimilar prompts"
+    )
+    
+    return results
+
+
 def test_rate_limiter():
     """Test token bucket rate limiter"""
     results = TestResults()
@@ -289,6 +396,23 @@ def test_rate_limiter():
         "Should allow request after replenishment"
     )
     
+    # Test waiting for a token
+    config.rate_limit_requests_per_minute = 600  # 10 per second
+    limiter = TokenBucket(config, logger)
+    start = time.time()
+    
+    async def acquire_all():
+        for _ in range(4):
+            await limiter.acquire()
+    
+    asyncio.run(acquire_all())
+    elapsed = time.time() - start
+    results.record(
+        "Rate Limiter: Acquire waits for token",
+        0.05 < elapsed < 0.5,
+        f"Expected ~0.1s wait after burst, got {elapsed:.3f}s"
+    )
+    
     return results
 
 
@@ -314,7 +438,7 @@ def test_memory_manager():
     )
     
     # Test FIFO behavior
-    first_entry = list(mm.history)[0]
+    first_entry = mm.history[0]
     results.record(
         "Memory Manager: FIFO behavior",
         first_entry["command"] == "cmd5",  # First 5 should be evicted
@@ -325,8 +449,8 @@ def test_memory_manager():
     limited = mm.get_history(limit=3)
     results.record(
         "Memory Manager: Get history with limit",
-        len(limited) == 3,
-        f"Expected 3 entries, got {len(limited)}"
+        [entry["command"] for entry in limited] == ["cmd7", "cmd8", "cmd9"],
+        f"Expected the 3 most recent entries, got {limited}"
     )
     
     # Test clear
@@ -386,6 +510,255 @@ async def test_async_operations():
     return results
 
 
+def make_command_shell(max_lines: int = 1000, timeout: int = 30) -> EnterpriseGPTShell:
+    """Shell with only what command execution needs (no LLM client)"""
+    shell = EnterpriseGPTShell.__new__(EnterpriseGPTShell)
+    shell.config = Config()
+    shell.config.command_max_output_lines = max_lines
+    shell.config.command_timeout = timeout
+    return shell
+
+
+def running_commands(needle: bytes) -> list:
+    """PIDs whose command line contains needle"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    if needle in f.read():
+                        pids.append(int(entry))
+            except OSError:
+                pass
+    return pids
+
+
+def run_in_pty(code: str) -> str:
+    """Run Python code in a child whose controlling terminal is a new pty"""
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        os.execv(sys.executable, [sys.executable, "-c", code])
+    output = b""
+    while True:
+        try:
+            data = os.read(fd, 1024)
+        except OSError:  # EIO once the child has exited
+            break
+        if not data:
+            break
+        output += data
+    os.close(fd)
+    os.waitpid(pid, 0)
+    return output.decode(errors="replace")
+
+
+async def test_command_execution():
+    """Test streamed command execution"""
+    results = TestResults()
+    
+    # Test multibyte characters split across reads
+    shell = make_command_shell()
+    original_chunk_size = gpt_shell_enterprise.STREAM_CHUNK_SIZE
+    gpt_shell_enterprise.STREAM_CHUNK_SIZE = 3
+    try:
+        exit_code, stdout, _ = await shell._execute_command("printf 'héllo wörld\\nß'")
+    finally:
+        gpt_shell_enterprise.STREAM_CHUNK_SIZE = original_chunk_size
+    
+    results.record(
+        "Command: Multibyte split across reads",
+        exit_code == 0 and stdout == "héllo wörld\nß",
+        f"Got {exit_code}, {stdout!r}"
+    )
+    
+    # Test huge output without newlines stays bounded and fast
+    start = time.monotonic()
+    exit_code, stdout, _ = await shell._execute_command(
+        "head -c 20000000 /dev/zero | tr '\\0' a"
+    )
+    elapsed = time.monotonic() - start
+    
+    results.record(
+        "Command: Long line truncated",
+        exit_code == 0
+        and len(stdout) <= gpt_shell_enterprise.STREAM_MAX_LINE_CHARS + 64
+        and stdout.endswith("(line truncated)")
+        and elapsed < 2,
+        f"Got {len(stdout)} chars in {elapsed:.2f}s"
+    )
+    
+    # Test head truncation with a note for the dropped lines
+    shell = make_command_shell(max_lines=3)
+    streamed = []
+    exit_code, stdout, _ = await shell._execute_command("seq 10", on_line=streamed.append)
+    
+    results.record(
+        "Command: Head truncation",
+        exit_code == 0
+        and stdout == "1\n2\n3\n\n... (7 more lines)\n"
+        and ''.join(streamed) == stdout,
+        f"Got {stdout!r}, streamed {streamed!r}"
+    )
+    
+    # Test nonzero exit keeps stderr
+    exit_code, stdout, stderr = await shell._execute_command("echo oops >&2; exit 3")
+    
+    results.record(
+        "Command: Nonzero exit with stderr",
+        exit_code == 3 and stdout == "" and stderr == "oops\n",
+        f"Got {exit_code}, {stdout!r}, {stderr!r}"
+    )
+    
+    # Test timeout kills the whole pipeline
+    shell = make_command_shell(timeout=1)
+    start = time.monotonic()
+    exit_code, _, stderr = await shell._execute_command("sleep 6 | cat")
+    elapsed = time.monotonic() - start
+    
+    results.record(
+        "Command: Timed-out pipeline",
+        exit_code == -1 and "timed out" in stderr and elapsed < 3,
+        f"Got {exit_code}, {stderr!r} after {elapsed:.1f}s"
+    )
+    
+    # Test cancellation (Ctrl+C) kills the whole pipeline
+    shell = make_command_shell()
+    task = asyncio.create_task(shell._execute_command("sleep 47.31 | cat"))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    try:
+        await task
+        cancelled = False
+    except asyncio.CancelledError:
+        cancelled = True
+    leftover = running_commands(b"sleep\x0047.31")
+    
+    results.record(
+        "Command: Cancelled pipeline killed",
+        cancelled and not leftover,
+        f"Cancelled {cancelled}, still running {leftover}"
+    )
+    
+    # Test commands keep the controlling terminal (sudo, ssh, passwd)
+    output = run_in_pty(
+        "import asyncio; "
+        "from test_enterprise import make_command_shell; "
+        "shell = make_command_shell(); "
+        "print(asyncio.run(shell._execute_command(': < /dev/tty && echo ok')))"
+    )
+    
+    results.record(
+        "Command: Controlling terminal",
+        "(0, 'ok\\n', '')" in output,
+        f"Got {output!r}"
+    )
+    
+    return results
+
+
+def make_llm_service(config: Config) -> LLMService:
+    """LLMService wired to real components; no request leaves the process"""
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    logger = StructuredLogger("test", "ERROR")
+    metrics = Metrics()
+    return LLMService(
+        config, logger, metrics,
+        CircuitBreaker(config, logger, metrics),
+        LRUCache(config, logger, metrics),
+        TokenBucket(config, logger),
+        SemanticCache(config, logger, metrics)
+    )
+
+
+async def test_llm_service():
+    """Test LLM service request flow"""
+    results = TestResults()
+    context = {"cwd": "/home/user", "os": "Linux"}
+    
+    # Test open breaker fails fast without an embedding call
+    service = make_llm_service(Config())
+    embed_calls = []
+    
+    async def record_embed(text):
+        embed_calls.append(text)
+        return None
+    
+    async def fallback(user_input):
+        return {"command": "", "explanation": "fallback", "safe": False}
+    
+    service._embed = record_embed
+    service._fallback_translation = fallback
+    service.circuit_breaker._transition_to_open()
+    service.circuit_breaker.last_failure_time = time.monotonic()
+    
+    result = await service.translate_command("list files", context)
+    
+    results.record(
+        "LLM: Open breaker skips embedding",
+        result["explanation"] == "fallback" and not embed_calls,
+        f"Got {result}, embed calls {embed_calls}"
+    )
+    
+    # Test cache keys keep case (paths are case-sensitive)
+    context_str = "/home/user|Linux"
+    results.record(
+        "LLM: Case-sensitive cache key",
+        service._generate_cache_key("cat README.md", context_str)
+        != service._generate_cache_key("cat readme.md", context_str),
+        "Inputs differing only in case must not share a cache entry"
+    )
+    
+    # Test semantic hits are not promoted to the exact cache
+    if service.semantic_cache.enabled:
+        service.circuit_breaker._transition_to_closed()
+        cached = {"command": "ls -la", "explanation": "list all", "safe": True}
+        service.semantic_cache.set([1.0, 0.0, 0.0], context_str, cached)
+        
+        async def same_embed(text):
+            return [1.0, 0.0, 0.0]
+        
+        service._embed = same_embed
+        result = await service.translate_command("show all files", context)
+        
+        results.record(
+            "LLM: Semantic hit not promoted",
+            result == cached
+            and service.cache.get(service._generate_cache_key("show all files", context_str)) is None,
+            f"Got {result}"
+        )
+    
+    await service.aclose()
+    
+    # Test only the first attempt streams tokens
+    config = Config()
+    config.retry_base_delay = 0.01
+    service = make_llm_service(config)
+    attempts = []
+    
+    async def flaky_call_llm(user_input, context, on_token=None, model=None):
+        attempts.append(on_token)
+        if on_token:
+            on_token('{"comm')
+        if len(attempts) == 1:
+            raise ConnectionError("stream dropped")
+        return {"command": "ls", "explanation": "list", "safe": True}
+    
+    service._call_llm = flaky_call_llm
+    tokens = []
+    result = await service._call_llm_with_retry_wrapper("list files", context, tokens.append)
+    
+    results.record(
+        "LLM: Retry does not re-stream",
+        result["command"] == "ls" and len(attempts) == 2 and attempts[1] is None
+        and tokens == ['{"comm'],
+        f"Got {result}, tokens {tokens}"
+    )
+    
+    await service.aclose()
+    return results
+
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 70)
@@ -430,6 +803,13 @@ def run_all_tests():
     all_results.failed += cache_results.failed
     all_results.tests.extend(cache_results.tests)
     
+    # Semantic cache tests
+    print("\n🧭 Testing Semantic Cache...")
+    sc_results = test_semantic_cache()
+    all_results.passed += sc_results.passed
+    all_results.failed += sc_results.failed
+    all_results.tests.extend(sc_results.tests)
+    
     # Rate limiter tests
     print("\n⏱️  Testing Rate Limiter...")
     rl_results = test_rate_limiter()
@@ -451,6 +831,20 @@ def run_all_tests():
     all_results.failed += async_results.failed
     all_results.tests.extend(async_results.tests)
     
+    # Command execution tests
+    print("\n🔧 Testing Command Execution...")
+    cmd_results = asyncio.run(test_command_execution())
+    all_results.passed += cmd_results.passed
+    all_results.failed += cmd_results.failed
+    all_results.tests.extend(cmd_results.tests)
+    
+    # LLM service tests
+    print("\n🤖 Testing LLM Service...")
+    llm_results = asyncio.run(test_llm_service())
+    all_results.passed += llm_results.passed
+    all_results.failed += llm_results.failed
+    all_results.tests.extend(llm_results.tests)
+    
     # Print summary
     all_results.summary()
     
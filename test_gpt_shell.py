@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test suite for GPT-OS shell command execution
+"""
+
+import os
+import pty
+import sys
+import time
+
+import gpt_shell
+from gpt_shell import GPTShell
+
+
+def run_in_pty(code: str) -> str:
+    """Run Python code in a child whose controlling terminal is a new pty"""
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        os.execv(sys.executable, [sys.executable, "-c", code])
+    output = b""
+    while True:
+        try:
+            data = os.read(fd, 1024)
+        except OSError:  # EIO once the child has exited
+            break
+        if not data:
+            break
+        output += data
+    os.close(fd)
+    os.waitpid(pid, 0)
+    return output.decode(errors="replace")
+
+
+def test_command_execution():
+    """Test command execution"""
+    # Command execution needs no LLM client, so skip __init__
+    shell = GPTShell.__new__(GPTShell)
+    results = {"passed": 0, "failed": 0}
+
+    # Test 1: Successful command
+    exit_code, stdout, stderr = shell.execute_command("echo hello")
+    if exit_code == 0 and stdout == "hello\n":
+        print("✅ Test 1: Successful command - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 1: Successful command - FAILED: {exit_code}, {stdout!r}")
+        results["failed"] += 1
+
+    # Test 2: Nonzero exit with stderr
+    exit_code, stdout, stderr = shell.execute_command("echo oops >&2; exit 3")
+    if exit_code == 3 and stderr == "oops\n":
+        print("✅ Test 2: Nonzero exit with stderr - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 2: Nonzero exit with stderr - FAILED: {exit_code}, {stderr!r}")
+        results["failed"] += 1
+
+    # Test 3: Timed-out pipeline is killed as a whole
+    original_timeout = gpt_shell.COMMAND_TIMEOUT
+    gpt_shell.COMMAND_TIMEOUT = 1
+    try:
+        start = time.monotonic()
+        exit_code, stdout, stderr = shell.execute_command("sleep 6 | cat")
+        elapsed = time.monotonic() - start
+    finally:
+        gpt_shell.COMMAND_TIMEOUT = original_timeout
+    if exit_code == -1 and "timed out" in stderr and elapsed < 3:
+        print("✅ Test 3: Timed-out pipeline - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 3: Timed-out pipeline - FAILED: {exit_code}, {stderr!r}, {elapsed:.1f}s")
+        results["failed"] += 1
+
+    # Test 4: Invalid UTF-8 is replaced instead of aborting the read
+    exit_code, stdout, stderr = shell.execute_command("printf '\\377\\n'; echo done")
+    if exit_code == 0 and stdout == "\ufffd\ndone\n":
+        print("✅ Test 4: Invalid UTF-8 output - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 4: Invalid UTF-8 output - FAILED: {exit_code}, {stdout!r}, {stderr!r}")
+        results["failed"] += 1
+
+    # Test 5: Commands keep the controlling terminal (sudo, ssh, passwd)
+    output = run_in_pty(
+        "from gpt_shell import GPTShell; "
+        "shell = GPTShell.__new__(GPTShell); "
+        "print(shell.execute_command(': < /dev/tty && echo ok'))"
+    )
+    if "(0, 'ok\\n', '')" in output:
+        print("✅ Test 5: Controlling terminal - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 5: Controlling terminal - FAILED: {output!r}")
+        results["failed"] += 1
+
+    # Summary
+    total = results["passed"] + results["failed"]
+    print(f"\n{'='*70}")
+    print(f"Command Execution Test Summary: {results['passed']}/{total} passed")
+    print(f"{'='*70}")
+
+    return results["failed"] == 0
+
+
+if __name__ == "__main__":
+    success = test_command_execution()
+    exit(0 if success else 1)
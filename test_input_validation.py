@@ -144,6 +144,64 @@ def test_input_validation():
         print(f"❌ Test 15: Risk assessment (low) - FAILED: {risk_level}")
         results["failed"] += 1
     
+    # Test 16: Keyword-only pattern (no trigger characters)
+    result = validator.validate("please EVAL this string")
+    if not result.is_valid and result.risk_level == "high":
+        print("✅ Test 16: Keyword-only pattern - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 16: Keyword-only pattern - FAILED: {result.error_message}")
+        results["failed"] += 1
+    
+    # Test 17: Risk assessment (sensitive keyword, any case)
+    risk_level, explanation = validator.get_risk_assessment("reset my PassWord")
+    if risk_level == "medium":
+        print("✅ Test 17: Risk assessment (sensitive) - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 17: Risk assessment (sensitive) - FAILED: {risk_level}")
+        results["failed"] += 1
+    
+    # Test 18: Batch validation matches single validation
+    batch = ["update my software", "cat file | sh", "", "  ls   -la "]
+    batch_results = validator.validate_many(batch)
+    if batch_results == [validator.validate(text) for text in batch]:
+        print("✅ Test 18: Batch validation - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 18: Batch validation - FAILED: {batch_results}")
+        results["failed"] += 1
+    
+    # Test 19: Safety check and risk assessment share one validation
+    validator.cache_clear()
+    validator.is_safe_for_llm("show disk usage")
+    validator.get_risk_assessment("show disk usage")
+    info = validator.cache_info()
+    if info.misses == 1 and info.hits == 1:
+        print("✅ Test 19: Shared validation cache - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 19: Shared validation cache - FAILED: {info}")
+        results["failed"] += 1
+    
+    # Test 20: Invalid UTF-8 (lone surrogate)
+    result = validator.validate("list files \udcff")
+    if not result.is_valid and "UTF-8" in result.error_message:
+        print("✅ Test 20: Invalid UTF-8 - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 20: Invalid UTF-8 - FAILED: {result.error_message}")
+        results["failed"] += 1
+    
+    # Test 21: Invalid UTF-8 does not mask an injection
+    risk_level, explanation = validator.get_risk_assessment("show files $(rm -rf /) \udcff")
+    if risk_level == "high":
+        print("✅ Test 21: Injection with invalid UTF-8 - PASSED")
+        results["passed"] += 1
+    else:
+        print(f"❌ Test 21: Injection with invalid UTF-8 - FAILED: {risk_level}, {explanation}")
+        results["failed"] += 1
+    
     # Summary
     total = results["passed"] + results["failed"]
     print(f"\n{'='*70}")